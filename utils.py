@@ -17,29 +17,126 @@
 # ==================================================================================================
 
 # Loading Packages
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import copy
+import functools
+import json
+import os
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 from IPython.display import HTML
 import yaml
 
+# Use the libyaml C bindings to parse the configuration when they are available
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# orjson decodes API responses considerably faster, fall back to the standard library if it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared HTTP session so repeated API calls reuse pooled keep-alive connections. Transient server
+# errors and rate limiting are retried with backoff, and the last response is returned if they persist
+SESSION = requests.Session()
+_retry = Retry(total=5, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+               allowed_methods=frozenset(['GET']), raise_on_status=False)
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=_retry)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Month names indexed by the zero-based issue month used by the API
+_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Administrative data cached by get_admin_data, keyed by (maproom, level, valid keys used to filter)
+_ADMIN_DATA_CACHE = {}
+_ADMIN_DATA_CACHE_SIZE = 64
+
+# Default FEWS NET regions of interest
+_REGIONS_OF_INTEREST = ("Atsimo-Atsinanana", "Anosy", "Atsimo-Andrefana", "Androy")
+
+# Columns of the trigger table, without and with a threshold protocol
+_DESIRED_COLS_NOPROT = ['Frequency (%)', 'Issue Month', 'Forecast', 'Forecast Threshold', 'Trigger Difference',
+                        'Forecast Accuracy (%)', 'Triggered', 'Design Tool URL']
+_DESIRED_COLS_PROT = ['Frequency (%)', 'Issue Month', 'Forecast', 'Forecast Threshold', 'Trigger Difference',
+                      'Forecast Accuracy (%)', 'Triggered', 'Adjusted Forecast Threshold',
+                      'Threshold Protocol', 'Triggered Adjusted', 'Design Tool URL']
+
 
 def load_config(file_path="config.yaml"):
     """
     Loads configuration data from a YAML file.
 
+    The parsed file is cached until its modification time changes.
+
     Args:
     - config_file (str): Path to the YAML configuration file.
 
     Returns:
     - dict: Dictionary containing configuration data.
     """    
+    config = _load_config_cached(file_path, os.path.getmtime(file_path))
+
+    # Return a copy so callers cannot modify the cached configuration
+    return copy.deepcopy(config)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(file_path, mtime):
+    """
+    Parses a YAML file, see load_config. The mtime argument only serves as part of the cache key.
+    """
     with open(file_path, "r") as file:
-        config = yaml.safe_load(file)
+        config = yaml.load(file, Loader=_YamlLoader)
     return config
 
 
+def _json_loads(content):
+    """
+    Decodes a JSON response body, using orjson when it is available.
+
+    Args:
+    - content (bytes): Raw response body.
+
+    Returns:
+    - dict or list: Decoded JSON data.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # orjson rejects non-standard values such as NaN, which the standard library accepts
+            pass
+    return json.loads(content)
+
+
+def _flatten(d, out, prefix='', sep='.'):
+    """
+    Flattens a nested dictionary into a single-level dictionary.
+
+    Args:
+    - d (dict): Dictionary to flatten.
+    - out (dict): Dictionary the flattened key/value pairs are written to.
+    - prefix (str): Key prefix for the current nesting level.
+    - sep (str): Separator used to join nested keys.
+    """
+    for key, value in d.items():
+        name = f"{prefix}{sep}{key}" if prefix else key
+        if isinstance(value, dict):
+            _flatten(value, out, name, sep)
+        else:
+            out[name] = value
+
+
 def get_data(maproom, mode, region, season, predictor, predictand, year,
-             issue_month0, freq, include_upcoming, threshold_protocol, username, password):
+             issue_month0, freq, include_upcoming, threshold_protocol, username, password, session=None):
     """
     Retrieves data from an API endpoint and combines it into a DataFrame.
 
@@ -56,11 +153,35 @@ def get_data(maproom, mode, region, season, predictor, predictand, year,
     - threshold_protocol (int): Threshold protocol value.
     - username (str): Username for API authentication.
     - password (str): Password for API authentication.
+    - session (requests.Session): Session used for the request, defaults to the shared SESSION.
 
     Returns:
     - DataFrame: returns a dataframe with a single row of the latest trigger information.
     """
-    
+    row = _get_data_row(maproom=maproom, mode=mode, region=region, season=season, predictor=predictor,
+                         predictand=predictand, year=year, issue_month0=issue_month0, freq=freq,
+                         include_upcoming=include_upcoming, threshold_protocol=threshold_protocol,
+                         username=username, password=password, session=session)
+
+    if row is None:
+        # Return an empty DataFrame or handle the error as needed
+        return pd.DataFrame()
+
+    # Rearrange the columns in a specific sequence
+    if threshold_protocol == 0:
+        return pd.DataFrame([row], columns=_DESIRED_COLS_NOPROT)
+    else:
+        return pd.DataFrame([row], columns=_DESIRED_COLS_PROT)
+
+
+def _get_data_row(maproom, mode, region, season, predictor, predictand, year,
+                  issue_month0, freq, include_upcoming, threshold_protocol, username, password, session=None):
+    """
+    Retrieves the latest trigger information from an API endpoint, see get_data.
+
+    Returns:
+    - dict: The trigger information keyed by output column name, or None if the request failed.
+    """
     # Make a GET request to the API
     region_str = ",".join(map(str, region))  # Convert region values to a comma-separated string
     api_url = (f"http://iridl.ldeo.columbia.edu/fbfmaproom2/{maproom}/"
@@ -73,176 +194,193 @@ def get_data(maproom, mode, region, season, predictor, predictand, year,
                f"&season={season}&predictors={predictor}&predictand={predictand}&year={year}"
                f"&issue_month0={issue_month0}&freq={freq}&severity=0&include_upcoming={include_upcoming}")
 
+    if session is None:
+        session = SESSION
+
     auth = (username, password)
-    response = requests.get(api_url, auth=auth)
+    response = session.get(api_url, auth=auth, timeout=30)
 
     # Check if the request was successful (status code 200)
     if response.status_code == 200:
         # Parse the JSON data
-        json_data = response.json()
-
-        # Flatten nested dictionaries using json_normalize
-        flattened_data = pd.json_normalize(json_data)
-
-        # Initialize a list to store non-nested columns
-        non_nested_columns = []
-
-        # Check for columns with nested data (list of dictionaries) and expand them
-        for column in flattened_data.columns:
-            if isinstance(flattened_data[column][0], list):
-                # Expand nested dictionaries in the list column
-                expanded_data = pd.json_normalize(flattened_data[column].explode(), sep='_')
-
-                # Combine the expanded columns with the original DataFrame
-                flattened_data = pd.concat([flattened_data, expanded_data], axis=1)
-
-                # Drop the original list column
-                flattened_data = flattened_data.drop(column, axis=1)
-            else:
-                # Save non-nested columns to the list
-                non_nested_columns.append(column)
-
-        # Create a separate DataFrame for non-nested columns
-        non_nested_df = flattened_data[non_nested_columns]
-
-        # Create a new DataFrame using the data from the first row of non-nested DataFrame
-        melted_non_nested_df = pd.DataFrame({
-            'Metric': non_nested_df.columns,
-            'Value': non_nested_df.iloc[0].values
-        })
-
-        melted_non_nested_df = melted_non_nested_df.iloc[:2, :]
-
-        replace_values = {'threshold': 'Forecast Threshold', 'skill.accuracy': 'Forecast Accuracy'}
-        melted_non_nested_df['Metric'] = melted_non_nested_df['Metric'].replace(replace_values)
-
-
-        # Convert melted_non_nested_df to a dictionary
-        melted_non_nested_dict = melted_non_nested_df.set_index('Metric')['Value'].to_dict()
-
-        # Convert flattened data to Pandas DataFrame
-        df = pd.DataFrame(flattened_data).drop(non_nested_df.columns, axis=1, errors='ignore')
-        df['triggered'] = df[predictor] > melted_non_nested_dict['Forecast Threshold']
-        df['trigger difference'] = df[predictor] - melted_non_nested_dict['Forecast Threshold']
-        df['Adjusted Forecast Threshold'] = melted_non_nested_dict['Forecast Threshold'] + threshold_protocol
-        df['Triggered Adjusted'] = df[predictor] > melted_non_nested_dict['Forecast Threshold']
-        df.rename(columns={predictor: 'forecast'}, inplace=True)
-        df['forecast'] = df['forecast']
-        df['trigger difference'] = df['trigger difference']
-        df = df.loc[:, ['forecast', 'trigger difference', 'triggered',
-                        'Triggered Adjusted', 'Adjusted Forecast Threshold']].iloc[1, :].to_frame().T
-
-        melted_non_nested_df['Value'] = melted_non_nested_df['Value']
-
-        # Combine df and melted_non_nested_df
-        melted_non_nested_df = melted_non_nested_df.T  # Transpose the DataFrame
-        melted_non_nested_df.columns = melted_non_nested_df.iloc[0]  # Set the first row as column names
-        melted_non_nested_df = melted_non_nested_df.iloc[1:, :].reset_index(drop=True).rename_axis(None,
-                                                                                                   axis=1)  # Reset index
-        combined_df = pd.concat([df.reset_index(drop=True), melted_non_nested_df], axis=1).reset_index(drop=True)
-        combined_df['Frequency (%)'] = f"{freq}%"
-        combined_df['Forecast Accuracy (%)'] = combined_df['Forecast Accuracy'] * 100
-        combined_df['Threshold Protocol'] = f"{threshold_protocol}"
-
-        month_mapping = {
-            0: 'Jan',
-            1: 'Feb',
-            2: 'Mar',
-            3: 'Apr',
-            4: 'May',
-            5: 'Jun',
-            6: 'Jul',
-            7: 'Aug',
-            8: 'Sep',
-            9: 'Oct',
-            10: 'Nov',
-            11: 'Dec'
+        json_data = _json_loads(response.content)
+
+        # Only the second record of the list columns holds the latest trigger information,
+        # so flatten that record alone instead of the full history
+        record = {}
+        for value in json_data.values():
+            if isinstance(value, list) and len(value) > 1 and isinstance(value[1], dict):
+                _flatten(value[1], record, sep='_')
+
+        # Missing data must not be reported as "not triggered", so treat it like a failed request
+        if not record:
+            print(f"Error: no latest record in the response for region {region_str}")
+            return None
+        if predictor not in record:
+            print(f"Error: no '{predictor}' value in the latest record for region {region_str}")
+            return None
+
+        # Read the forecast threshold and accuracy directly from the JSON data
+        threshold = json_data['threshold']
+        accuracy = json_data['skill']['accuracy']
+
+        # Only an explicit null forecast becomes NaN
+        forecast = record[predictor]
+        if forecast is None:
+            forecast = np.nan
+
+        # Build the single output row directly under its final column names
+        row = {
+            'Frequency (%)': f"{freq}%",
+            'Issue Month': _MONTH_NAMES[issue_month0],
+            'Forecast': forecast,
+            'Forecast Threshold': threshold,
+            'Trigger Difference': forecast - threshold,
+            'Forecast Accuracy (%)': accuracy * 100,
+            'Triggered': forecast > threshold,
+            'Adjusted Forecast Threshold': threshold + threshold_protocol,
+            'Threshold Protocol': f"{threshold_protocol}",
+            'Triggered Adjusted': forecast > threshold,
+            'Design Tool URL': f"<a href='{tool_url}'>Design Tool Link</a>"
         }
 
-        combined_df['Issue Month'] = issue_month0
-        combined_df['Issue Month'] = combined_df['Issue Month'].map(month_mapping)
-
-        # After preparing your final DataFrame (e.g., combined_df), add the hyperlink
-        combined_df['Design Tool URL'] = f"<a href='{tool_url}'>Design Tool Link</a>"
-
-        # Rearrange the columns in a specific sequence
-        if threshold_protocol == 0:
-            desired_columns = ['Frequency (%)', 'Issue Month', 'forecast', 'Forecast Threshold', 'trigger difference',
-                               'Forecast Accuracy (%)', 'triggered', 'Design Tool URL']
-            combined_df = combined_df[desired_columns]
-        else:
-            desired_columns = ['Frequency (%)', 'Issue Month', 'forecast', 'Forecast Threshold', 'trigger difference',
-                               'Forecast Accuracy (%)', 'triggered', 'Adjusted Forecast Threshold',
-                               'Threshold Protocol', 'Triggered Adjusted', 'Design Tool URL']
-            combined_df = combined_df[desired_columns]
-
-        combined_df = combined_df.rename(columns={
-                                            'forecast': 'Forecast',
-                                            'triggered': 'Triggered',
-                                            'trigger difference': 'Trigger Difference'
-                                        })
-
-        # Return the combined DataFrame
-        return combined_df
+        return row
     else:
-        # Return an empty DataFrame or handle the error as needed
         print(f"Error: {response.status_code}")
-        return pd.DataFrame()
+        return None
 
 
-def get_admin_data(maproom, level, username, password, need_valid_keys, valid_keys=None):
+def get_admin_data(maproom, level, username, password, need_valid_keys, valid_keys=None, session=None):
     """
     Retrieves administrative data from an API endpoint.
 
+    Results are cached per maproom, level and the valid keys used to filter, so repeated calls do not hit
+    the API again.
+
     Args:
     - maproom (str): Maproom value.
     - level (str): Level of administrative data.
+    - session (requests.Session): Session used for the request, defaults to the shared SESSION.
 
     Returns:
     - DataFrame: DataFrame containing administrative data.
     """
+    if session is None:
+        session = SESSION
+
+    # valid_keys only matters when it is used to filter, and may be any iterable accepted by Series.isin,
+    # so it goes into the cache key as a tuple. The regions do not depend on who requests them, so the
+    # credentials and session are not part of the key
+    if level != 0 and need_valid_keys is True:
+        key_filter = tuple(valid_keys)
+    else:
+        key_filter = None
+    cache_key = (maproom, level, key_filter)
+    df = _ADMIN_DATA_CACHE.get(cache_key)
+    if df is None:
+        df = _fetch_admin_data(maproom, level, username, password, need_valid_keys, valid_keys, session)
+
+        # Failed requests are not cached
+        if df is None:
+            return None
+
+        # Evict the oldest entry once the cache is full
+        if len(_ADMIN_DATA_CACHE) >= _ADMIN_DATA_CACHE_SIZE:
+            del _ADMIN_DATA_CACHE[next(iter(_ADMIN_DATA_CACHE))]
+        _ADMIN_DATA_CACHE[cache_key] = df
+
+    # Return a copy so callers cannot modify the cached DataFrame
+    return df.copy()
+
+
+def _fetch_admin_data(maproom, level, username, password, need_valid_keys, valid_keys, session):
+    """
+    Fetches administrative data from the API, see get_admin_data.
+
+    Returns:
+    - DataFrame: DataFrame containing administrative data, or None if the request failed.
+    """
     # Construct the API URL with the provided parameters
     api_url = f"http://iridl.ldeo.columbia.edu/fbfmaproom2/regions?country={maproom}&level={level}"
 
     # Make a GET request to the API
     if username and password:
         auth = (username, password)
-        response = requests.get(api_url, auth=auth)
+        response = session.get(api_url, auth=auth, timeout=30)
     else:
-        response = requests.get(api_url)
+        response = session.get(api_url, timeout=30)
 
     # Check if the request was successful (status code 200)
-    if response.status_code == 200:
-        # Parse the JSON data
-        json_data = response.json()
+    if response.status_code != 200:
+        # Print an error message if the request was not successful
+        print(f"Error: {response.status_code}")
+        return None
 
-        # Create a DataFrame from the JSON data
-        df = pd.DataFrame(json_data)
+    # Parse the JSON data
+    json_data = _json_loads(response.content)
 
-        # Extract "key" and "label" from the "regions" column
-        df[['key', 'label']] = df['regions'].apply(pd.Series)
+    # Create a DataFrame from the JSON data
+    df = pd.DataFrame(json_data)
 
-        # Filter keys if valid_keys is provided
-        if level != 0:
-            if need_valid_keys is True:
-                df = df[df['key'].isin(valid_keys)]
+    # Extract "key" and "label" from the "regions" column
+    df[['key', 'label']] = pd.DataFrame(df['regions'].tolist(), index=df.index)
 
-        # Drop the original "regions" column if needed
-        df = df.drop('regions', axis=1)
+    # Filter keys if valid_keys is provided
+    if level != 0:
+        if need_valid_keys is True:
+            df = df[df['key'].isin(valid_keys)]
 
-        return df
-    else:
-        # Print an error message if the request was not successful
-        print(f"Error: {response.status_code}")
-        return None
+    # Drop the original "regions" column if needed
+    df = df.drop('regions', axis=1)
+
+    return df
+
+
+def get_combined_trigger_table(maproom, mode, season, predictor, predictand, year,
+                               issue_month, frequencies, include_upcoming, threshold_protocol, username, password,
+                               need_valid_keys, valid_keys, max_workers=16, session=None):
+    """
+    Retrieves the trigger information for every frequency, issue month and region as a single table.
+
+    Args:
+    - maproom (str): Maproom value.
+    - mode (int): Mode value.
+    - season (str): Season value.
+    - predictor (str): Predictor value.
+    - predictand (str): Predictand value.
+    - issue_month (list): List of issue month values.
+    - frequencies (list): List of frequency values.
+    - include_upcoming (str): Include upcoming value.
+    - threshold_protocol (int): Threshold protocol value.
+    - username (str): Username for API authentication.
+    - password (str): Password for API authentication.
+    - need_valid_keys (bool): Flag indicating if valid keys are needed.
+    - valid_keys (list): List of valid keys.
+    - max_workers (int): Number of threads used to fetch the tables concurrently.
+    - session (requests.Session): Session shared by all requests, defaults to the shared SESSION.
+
+    Returns:
+    - DataFrame: DataFrame with one row of trigger information per frequency, issue month and region.
+    """
+    _, table = _get_trigger_rows(maproom=maproom, mode=mode, season=season, predictor=predictor,
+                                 predictand=predictand, year=year, issue_month=issue_month,
+                                 frequencies=frequencies, include_upcoming=include_upcoming,
+                                 threshold_protocol=threshold_protocol, username=username,
+                                 password=password, need_valid_keys=need_valid_keys,
+                                 valid_keys=valid_keys, max_workers=max_workers, session=session)
+
+    return table.reset_index(drop=True)
 
 
 def get_trigger_tables(maproom, mode, season, predictor, predictand, year,
                        issue_month, frequencies, include_upcoming, threshold_protocol, username, password,
-                       need_valid_keys, valid_keys):
+                       need_valid_keys, valid_keys, max_workers=16, session=None):
     """
     Retrieves trigger tables based on specified parameters.
 
+    The tables are partitioned from a single combined table, see get_combined_trigger_table. A failed
+    request gets an empty table that has all the trigger table columns.
+
     Args:
     - maproom (str): Maproom value.
     - mode (int): Mode value.
@@ -257,56 +395,109 @@ def get_trigger_tables(maproom, mode, season, predictor, predictand, year,
     - password (str): Password for API authentication.
     - need_valid_keys (bool): Flag indicating if valid keys are needed.
     - valid_keys (list): List of valid keys.
+    - max_workers (int): Number of threads used to fetch the tables concurrently.
+    - session (requests.Session): Session shared by all requests, defaults to the shared SESSION.
 
     Returns:
     - dict: Dictionary containing trigger tables.
     """
-    print("Fetching....")
-    # Initialize a dictionary to store admin tables
-    admin_tables = {}
-
-    # Creating trigger tables
+    table_names, table = _get_trigger_rows(maproom=maproom, mode=mode, season=season, predictor=predictor,
+                                           predictand=predictand, year=year, issue_month=issue_month,
+                                           frequencies=frequencies, include_upcoming=include_upcoming,
+                                           threshold_protocol=threshold_protocol, username=username,
+                                           password=password, need_valid_keys=need_valid_keys,
+                                           valid_keys=valid_keys, max_workers=max_workers, session=session)
+
+    # Split the combined table back into one table per request, failed requests get an empty table with
+    # the trigger table columns
+    tables = dict(iter(table.groupby(level=0, sort=False)))
+    empty_table = table.iloc[0:0]
 
     admin_name = f"admin{mode}_tables"
-    admin_tables[admin_name] = {}
+    admin_tables = {admin_name: {}}
+    for table_name in table_names:
+        admin_tables[admin_name][table_name] = tables.get(table_name, empty_table).reset_index(drop=True)
+
+    return admin_tables
+
+
+def _get_trigger_rows(maproom, mode, season, predictor, predictand, year,
+                      issue_month, frequencies, include_upcoming, threshold_protocol, username, password,
+                      need_valid_keys, valid_keys, max_workers=16, session=None):
+    """
+    Fetches the trigger information for every frequency, issue month and region, see get_trigger_tables.
+
+    Returns:
+    - list: Table names, one per request, in request order.
+    - DataFrame: Combined trigger information indexed by table name, failed requests are left out.
+    """
+    print("Fetching....")
+    if session is None:
+        session = SESSION
+
     admin_data = get_admin_data(maproom, mode, username=username, password=password,
-                                need_valid_keys=need_valid_keys, valid_keys=valid_keys)
+                                need_valid_keys=need_valid_keys, valid_keys=valid_keys, session=session)
 
+    # Collect one task per (frequency, month, region) combination
+    tasks = []
     for freq in frequencies:
         for month in issue_month:
             # Iterate over each key value
             if isinstance(admin_data, pd.Series):
-                for region_key, label in admin_data.items():
+                for region_key, label in zip(admin_data.index.to_numpy(), admin_data.to_numpy()):
                     print(region_key, label)
-                    table_name = f"output_freq_{freq}_mode_{mode}_month_{month}_region_{region_key}_table"
-
-                    df = get_data(maproom=maproom, mode=mode, region=[region_key],
-                                  season=season, predictor=predictor, predictand=predictand, year = year,
-                                  issue_month0=month, freq=freq, include_upcoming=include_upcoming,
-                                  threshold_protocol=threshold_protocol, username=username, password=password)
-
-                    df.insert(0, 'Admin Name', label)
-                    admin_tables[admin_name][table_name] = df
+                    tasks.append((freq, month, region_key, label))
 
             elif isinstance(admin_data, pd.DataFrame):
-                for index, row in admin_data.iterrows():
-                    region_key, label = row['key'], row['label']
-
-                    table_name = f"output_freq_{freq}_mode_{mode}_month_{month}_region_{region_key}_table"
-
-                    df = get_data(maproom=maproom, mode=mode, region=[region_key],
-                                  season=season, predictor=predictor, predictand=predictand, year = year,
-                                  issue_month0=month, freq=freq, include_upcoming=include_upcoming,
-                                  threshold_protocol=threshold_protocol, username=username, password=password)
-
-                    df.insert(0, 'Admin Name', label)
-                    admin_tables[admin_name][table_name] = df
+                for region_key, label in zip(admin_data['key'].to_numpy(), admin_data['label'].to_numpy()):
+                    tasks.append((freq, month, region_key, label))
 
             else:
                 # Handle other cases or raise an error
                 raise ValueError("Unexpected output type from get_admin_data.")
 
-    return admin_tables
+    # Repeated frequencies or months would fetch the same table twice, keep only the first of each task
+    tasks = list(dict.fromkeys(tasks))
+
+    def fetch_row(freq, month, region_key, label):
+        row = _get_data_row(maproom=maproom, mode=mode, region=[region_key],
+                            season=season, predictor=predictor, predictand=predictand, year=year,
+                            issue_month0=month, freq=freq, include_upcoming=include_upcoming,
+                            threshold_protocol=threshold_protocol, username=username, password=password,
+                            session=session)
+
+        if row is not None:
+            row['Admin Name'] = label
+        return row
+
+    # The requests are I/O bound, so fetch them concurrently
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_row, *task): task for task in tasks}
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        except BaseException:
+            # Stop at the first failure instead of waiting for every queued request to run
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    # Assemble the rows in the same order as the requests were made
+    table_names, rows, index = [], [], []
+    for task in tasks:
+        freq, month, region_key, label = task
+        table_name = f"output_freq_{freq}_mode_{mode}_month_{month}_region_{region_key}_table"
+        table_names.append(table_name)
+        if results[task] is not None:
+            rows.append(results[task])
+            index.append(table_name)
+
+    if threshold_protocol == 0:
+        columns = ['Admin Name'] + _DESIRED_COLS_NOPROT
+    else:
+        columns = ['Admin Name'] + _DESIRED_COLS_PROT
+
+    return table_names, pd.DataFrame(rows, index=index, columns=columns)
 
 def generate_colors(n):
     """
@@ -338,38 +529,25 @@ def style_and_render_df_with_hyperlinks(df):
         color_maps[column] = {value: unique_colors[color_index + i] for i, value in enumerate(unique_values)}
         color_index += len(unique_values)
     
-    # Function to apply colors based on the value for a given column
-    def apply_color(val, column):
-        if pd.isnull(val):
-            return ''  # Return default style for NaN values
-        return f'background-color: {color_maps[column].get(val, "")};'
-    
     # Initialize the styled DataFrame
     styled_df = df.style
     
-    # Apply the styles to each column individually
+    # Apply the styles to each column individually, leaving NaN values with the default style
     for column in columns_to_style:
-        styled_df = styled_df.map(lambda val, col=column: apply_color(val, col), subset=[column])
+        colors = df[column].map(color_maps[column]).fillna('')
+        css = np.where(df[column].notna(), 'background-color: ' + colors + ';', '')
+        styled_df = styled_df.apply(lambda _, css=css: css, subset=[column], axis=0)
     
     # Apply boolean highlights for 'triggered' and 'Triggered Adjusted' columns
     true_color, false_color = '#CCFFCC', '#FFCC99'
     
-    # Assuming styled_df is your DataFrame styled object, and true_color/false_color are defined
     columns_to_style = ['Triggered', 'Triggered Adjusted']
     
     for col in columns_to_style:
-        try:
-            # Check if column exists by trying to access it
-            if col in styled_df.columns:
-                # Apply the styling if column exists
-                styled_df = styled_df.map(lambda val: f'background-color: {true_color if val else false_color}', subset=[col])
-            else:
-                # If the column does not exist in the DataFrame, this line will not be executed
-                pass
-        except KeyError as e:
-            print(f"Column not found: {e}")
-            # Handle the case where the column does not exist, e.g., by logging or passing
-            continue
+        # Only style the columns present in the DataFrame
+        if col in df.columns:
+            css = np.where(df[col].to_numpy(), f'background-color: {true_color}', f'background-color: {false_color}')
+            styled_df = styled_df.apply(lambda _, css=css: css, subset=[col], axis=0)
     
     # Format numerical columns
     styled_df = styled_df.format({'forecast': "{:.2f}", 'trigger difference': "{:.2f}", 'Forecast Accuracy (%)': "{:.2%}"})
@@ -378,7 +556,24 @@ def style_and_render_df_with_hyperlinks(df):
     rendered_html = styled_df.to_html(escape=False)
     display(HTML(rendered_html))
 
-def fetch_fewsnet_maadagascar(country_code="MG", scenario='CS', regions_of_interest = ["Atsimo-Atsinanana", "Anosy", "Atsimo-Andrefana", "Androy"]):
+def _compile_regions(regions):
+    """
+    Compiles a regex matching any of the given region names.
+
+    Args:
+    - regions (list of str): Region names to match.
+
+    Returns:
+    - re.Pattern: Compiled regular expression.
+    """
+    return re.compile('|'.join(map(re.escape, regions)))
+
+
+# Pattern for the default regions of interest, compiled once at import
+_REGIONS_RE = _compile_regions(_REGIONS_OF_INTEREST)
+
+
+def fetch_fewsnet_maadagascar(country_code="MG", scenario='CS', regions_of_interest=_REGIONS_OF_INTEREST):
     """
     Fetches and processes food security data from the FEWS NET API for Madagascar, 
     filtering by specific scenarios and regions of interest.
@@ -398,7 +593,8 @@ def fetch_fewsnet_maadagascar(country_code="MG", scenario='CS', regions_of_inter
     2. Fills missing values and converts relevant columns to categorical types.
     3. Filters data for months of interest (October to February) and years of interest (2023 and 2024).
     4. Further filters data for the specified scenario and regions of interest.
-    5. Adds a 'region' column based on the 'geographic_unit_full_name' column.
+    5. Adds a 'region' column based on the 'geographic_unit_full_name' column. If a name contains
+       several regions, the one listed first in regions_of_interest is used.
 
     Returns:
     - pandas.DataFrame: Filtered and processed DataFrame containing the food security data
@@ -439,25 +635,29 @@ def fetch_fewsnet_maadagascar(country_code="MG", scenario='CS', regions_of_inter
     description_order = ['Minimal', 'Stressed', 'Crisis', 'Emergency', 'Famine']
     df['description'] = pd.Categorical(df['description'], categories=description_order, ordered=True)
     
-    # Convert 'projection_start' and 'projection_end' to datetime to extract months for filtering
-    df['projection_start_month'] = pd.to_datetime(df['projection_start']).dt.month
-    df['projection_end_month'] = pd.to_datetime(df['projection_end']).dt.month
+    # Extract months from the already parsed 'projection_start' and 'projection_end' for filtering
+    df['projection_start_month'] = df['projection_start'].dt.month
+    df['projection_end_month'] = df['projection_end'].dt.month
     
     # Define the months of interest: October(10), November(11), December(12), January(1), February(2)
     months_of_interest = [10, 11, 12, 1, 2]
     
     # Filter rows where any of the months of interest falls between or is included in the projection start or end months
-    df = df[df.apply(lambda row: any(month in months_of_interest for month in range(row['projection_start_month'], row['projection_end_month'] + 1)), axis=1)]
+    start_months = df['projection_start_month'].to_numpy()
+    end_months = df['projection_end_month'].to_numpy()
+    months = np.arange(1, 13)[None, :]
+    months_mask = (months >= start_months[:, None]) & (months <= end_months[:, None])
+    df = df[months_mask[:, np.array(months_of_interest) - 1].any(axis=1)]
     
     # Extract years from 'projection_start' and 'projection_end'
-    df['projection_start_year'] = pd.to_datetime(df['projection_start']).dt.year
-    df['projection_end_year'] = pd.to_datetime(df['projection_end']).dt.year
+    df['projection_start_year'] = df['projection_start'].dt.year
+    df['projection_end_year'] = df['projection_end'].dt.year
     
     # Define the years of interest
     years_of_interest = [2023, 2024]
     
     # Filter rows where either projection start or end year is in the years of interest
-    df = df[df.apply(lambda row: row['projection_start_year'] in years_of_interest or row['projection_end_year'] in years_of_interest, axis=1)]
+    df = df[df['projection_start_year'].isin(years_of_interest) | df['projection_end_year'].isin(years_of_interest)]
     
     # Display the structure of the DataFrame after these changes and the count of missing values
     df.info(), missing_values
@@ -465,21 +665,19 @@ def fetch_fewsnet_maadagascar(country_code="MG", scenario='CS', regions_of_inter
     # Filtering the data for scenarios, by default, for 'CS' or 'Current Situation'
     df = df[df['scenario'] == scenario]
     
-    # String search to filter the dataset for the specified regions 
-    regions_of_interest = regions_of_interest
-    df = df[
-        df['geographic_unit_full_name'].str.contains('|'.join(regions_of_interest))
-    ]
-    
-    # Creating a function to determine the region based on 'geographic_unit_full_name'
-    def determine_region(name):
-        for region in regions_of_interest:
-            if region in name:
-                return region
-        return None  # Returns None if no specific region is found
+    # String search for the specified regions, the default regions use the precompiled pattern
+    if tuple(regions_of_interest) == _REGIONS_OF_INTEREST:
+        regions_re = _REGIONS_RE
+    else:
+        regions_re = _compile_regions(regions_of_interest)
+    df = df[df['geographic_unit_full_name'].str.contains(regions_re)]
     
-    # Applying the function to create the 'region' column
-    df['region'] = df['geographic_unit_full_name'].apply(determine_region)
+    # Creating the 'region' column. A name containing several regions gets the first of them in
+    # regions_of_interest order, so assign the regions in reverse order and let earlier ones overwrite
+    region = pd.Series(None, index=df.index, dtype=object)
+    for name in reversed(regions_of_interest):
+        region[df['geographic_unit_full_name'].str.contains(name, regex=False)] = name
+    df['region'] = region
     
     return df
 